@@ -2,31 +2,101 @@
 base functions that all other connection files, including classes.
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
 import sqlite3
-from typing import Optional, Dict
-from flask import g
+import threading
+from typing import Callable, Optional, Dict
 
 
 DATABASE = "database.db"
 
-
-def make_dicts(cursor, row) -> dict:
-    """row factory for database to turn tuples of values into dicts"""
-    return dict((cursor.description[idx][0], value) for idx, value in enumerate(row))
+# Connections are opened once per database file and shared by every request,
+# the lock stops requests on different threads interleaving their queries.
+_connections: Dict[str, sqlite3.Connection] = {}
+DATABASE_LOCK = threading.RLock()
+
+# Functions that empty the module level caches (users, games, tags and platforms).
+# They are all called once another connection, such as another worker or an
+# outside tool, has committed a change, so no worker serves stale cached rows.
+_cache_clearers: list[Callable[[], None]] = []
+_data_versions: Dict[str, int] = {}
+
+# Indexes for lookups the tables don't already cover,
+# username, title, game_tag_name and platform_name are UNIQUE so are already indexed.
+INDEXES = (
+    # game_id first for the joins, second column lets them skip the table.
+    "CREATE INDEX IF NOT EXISTS idx_gta_game_tag"
+    " ON GameTagAssignment(game_id, game_tag_id)",
+    "CREATE INDEX IF NOT EXISTS idx_pa_game_platform"
+    " ON PlatformAssignment(game_id, platform_id)",
+    "CREATE INDEX IF NOT EXISTS idx_reviews_game_user ON Reviews(game_id, user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_reviews_game_platform ON Reviews(game_id, platform_id)",
+    "CREATE INDEX IF NOT EXISTS idx_reviews_user ON Reviews(user_id)",
+)
+
+
+# Settings applied once to each connection when it is opened.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA mmap_size = 268435456",
+)
+
+
+def create_indexes(db: sqlite3.Connection) -> None:
+    """creates any missing indexes, called once when a connection is opened"""
+    for index in INDEXES:
+        db.execute(index)
+    db.commit()
+    # gathers stats for the query planner on any tables that need them (ANALYZE).
+    db.execute("PRAGMA optimize")
 
 
 def get_database(database=DATABASE):
-    """returns a database connection and cursor object of connection"""
+    """returns the shared database connection and cursor object of connection"""
+
+    with DATABASE_LOCK:
+        # If db has not been opened yet by any request.
+        if database not in _connections:
+            db = sqlite3.connect(
+                database, check_same_thread=False, cached_statements=256
+            )
+            # sqlite3.Row is built in C and still supports row["column"] access.
+            db.row_factory = sqlite3.Row
+            for pragma in PRAGMAS:
+                db.execute(pragma)
+            create_indexes(db)
+            _connections[database] = db
+
+        # Return database connection and cursor.
+        db = _connections[database]
+        cursor = db.cursor()
+    return db, cursor
+
 
-    # If db is not found in global.
-    if "db" not in g:
-        g.db = sqlite3.connect(database)
-        g.db.row_factory = make_dicts
+def register_cache_clear(clear: Callable[[], None]) -> None:
+    """registers a function that empties a module's cache, see check_data_version."""
+    _cache_clearers.append(clear)
 
-    # Return database connection and cursor.
-    cursor = g.db.cursor()
-    return g.db, cursor
+
+def check_data_version(database=DATABASE) -> None:
+    """
+    clears every registered cache if another connection has committed a change
+    since the last check, should be called before serving a cached entry.
+    data_version only changes for other connections' commits,
+    this connection's writes remove the cached entries they change themselves.
+    """
+    _, cursor = get_database(database)
+    with DATABASE_LOCK:
+        version = cursor.execute("PRAGMA data_version").fetchone()[0]
+        cursor.close()
+        if _data_versions.get(database) != version:
+            _data_versions[database] = version
+            for clear in _cache_clearers:
+                clear()
 
 
 def query_db(query: str, args=(), fetch: bool = True, one: bool = False):
@@ -39,31 +109,43 @@ def query_db(query: str, args=(), fetch: bool = True, one: bool = False):
         should be false for something like INSERT.
         one (bool): if true function will only fetch first value of query,
         does nothing if fetch = false.
+    Returns:
+        the fetched data if fetch = true, otherwise the used cursor
+        so callers can check rowcount / lastrowid of the write.
     """
     # Get connection
 
     db, cursor = get_database()
 
-    # Complete Query
-    cursor.execute(query, args)
-
-    # Pull and return data from database if required.
-    if fetch:
-        if one:
-            data = cursor.fetchone()
-        else:
-            data = cursor.fetchall()
-        return data
-
-    # close cursor and commit any changes.
-    cursor.close()
-    db.commit()
+    # Hold the lock so another thread can't commit part way through this query.
+    with DATABASE_LOCK:
+        try:
+            # Complete Query
+            cursor.execute(query, args)
+
+            # Pull and return data from database if required.
+            if fetch:
+                if one:
+                    data = cursor.fetchone()
+                else:
+                    data = cursor.fetchall()
+                return data
+
+            # close cursor and commit any changes.
+            cursor.close()
+            db.commit()
+        except sqlite3.Error:
+            # undo the failed write so the shared connection doesn't keep the
+            # write lock, or leave it to be committed by the next query.
+            db.rollback()
+            raise
+    return cursor
 
 
 # Data Classes
 
 
-@dataclass
+@dataclass(slots=True)
 class User:
     """
     Represents a user with relevant metadata, same as columns in Users table.
@@ -94,7 +176,35 @@ class User:
         )
 
 
-@dataclass
+@dataclass(slots=True)
+class PublicUser:
+    """
+    Represents a user without their password hash, safe to show or send to the browser.
+    """
+
+    user_id: int
+    username: str
+    date_joined: int
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates a PublicUser from a data object
+
+        Args:
+            user_id (int): id of the user in Users table.
+            username (str): name of the user.
+            date_joined (int): unix timestamp format of when user made account.
+            data (Dict): Required dict with all previous values.
+        """
+        return cls(
+            user_id=data["user_id"],
+            username=data["username"],
+            date_joined=data["date_joined"],
+        )
+
+
+@dataclass(slots=True)
 class GameTag:
     """
     Represents a Game Tag with relevant metadata, same as columns in GameTags table.
@@ -104,7 +214,7 @@ class GameTag:
     name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Platform:
     """
     Represents a platform with relevant metadata, same as columns in Platforms table.
@@ -114,7 +224,7 @@ class Platform:
     name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Game:
     """
     Represents a video game with relevant metadata,
@@ -129,6 +239,19 @@ class Game:
     image_link: str
     game_id: int
 
+    # Not columns, filled in by pages that display review stats for the game.
+    rating: float = field(default=0, compare=False)
+    review_count: int = field(default=0, compare=False)
+    date_str: Optional[str] = field(default=None, compare=False)
+    has_colourblind_support: int = field(default=0, compare=False)
+    has_subtitles: int = field(default=0, compare=False)
+    has_difficulty_options: int = field(default=0, compare=False)
+
+    @property
+    def release_datetime(self) -> datetime:
+        """release_date as a datetime, only made when something needs to format it."""
+        return datetime.fromtimestamp(self.release_date)
+
     @classmethod
     def from_dict(cls, data):
         """
@@ -149,13 +272,13 @@ class Game:
             description=data["description"],
             release_date=data["release_date"],
             developer=data["developer"],
-            publisher=data.get("publisher", data["developer"]),
+            publisher=data["publisher"] or data["developer"],
             image_link=data["image_link"],
             game_id=data["game_id"],
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class AccessibilityOptions:
     """Represents possible accessibility options a game can have"""
 
@@ -164,7 +287,7 @@ class AccessibilityOptions:
     has_difficulty_options: bool
 
 
-@dataclass
+@dataclass(slots=True)
 class Review:
     """
     Represents a review with relevant metadata, same as columns in Reviews table.
@@ -179,6 +302,10 @@ class Review:
     accessibility: AccessibilityOptions
     platform_id: int
 
+    # Not columns, filled in by pages that show who wrote the review and on what.
+    user: Optional[PublicUser] = field(default=None, compare=False)
+    platform: Optional[Platform] = field(default=None, compare=False)
+
     @classmethod
     def from_dict(cls, data: Dict) -> "Review":
         """
@@ -192,14 +319,14 @@ class Review:
             review_date (int): date the review was uploaded in unix timestamp format.
             accessibility (AccessibilityOptions): Tuple representing accessibilty options for game.
             platform_id (int): the id of the platform the user played the game on.
-            data (Dict): Required dict with all previous values.
+            data (Dict): Required dict or row with all previous values.
         """
         return cls(
-            review_id=data.get("review_id"),
+            review_id=data["review_id"],
             user_id=data["user_id"],
             game_id=data["game_id"],
             rating=data["rating"],
-            review_text=data.get("review_text"),
+            review_text=data["review_text"],
             review_date=data["review_date"],
             accessibility=AccessibilityOptions(
                 data["has_colourblind_support"],
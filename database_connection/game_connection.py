@@ -1,12 +1,32 @@
 """functions that allow connection between database and web app specifically for games."""
 
 from datetime import datetime
-from thefuzz import fuzz
-from database_connection.base_db_connections import query_db, Game
+import json
+import math
+import sqlite3
+from typing import Iterable, Optional
+from rapidfuzz import fuzz, process
+from database_connection.base_db_connections import (
+    DATABASE_LOCK,
+    check_data_version,
+    get_database,
+    query_db,
+    register_cache_clear,
+    Game,
+)
 from database_connection.review_connection import ReviewConnector
 
 ReviewConnection = ReviewConnector()
 
+# Search used to keep games whose thefuzz ratio, rounded half to even, was over 20,
+# so only raw rapidfuzz scores above 20.5 are kept.
+MIN_MATCH_SCORE = math.nextafter(20.5, math.inf)
+
+# Rows of games looked up by id, kept until that game is changed.
+# Rows are cached rather than Games since pages fill in a Game's display fields.
+_GAME_ROW_CACHE: dict[int, sqlite3.Row] = {}
+register_cache_clear(_GAME_ROW_CACHE.clear)
+
 
 class GameConnector:
     """class that contains game related functions for the database"""
@@ -35,13 +55,8 @@ class GameConnector:
         if data is None:
             raise KeyError("No Games Found in Database?!")
 
-        games = []
-
         # convert data to game class objects.
-        for row in data:
-            game = Game.from_dict(row)
-            games.append(game)
-
+        games = [Game.from_dict(row) for row in data]
         return games
 
     def get_game_by_id(self, game_id: int) -> Game:
@@ -52,10 +67,15 @@ class GameConnector:
             game_id (int): The ID of the game to retrieve.
 
         Returns:
-            game (Game): object containing each column of found row in database.
+            game (Game): object containing each column of found row in database,
+            None if no game has that id.
         Raises:
             TypeError: If game_id is not an integer.
         """
+        # Use the cached row if this game has already been looked up.
+        check_data_version()
+        if game_id in _GAME_ROW_CACHE:
+            return Game.from_dict(_GAME_ROW_CACHE[game_id])
 
         data = query_db(
             """
@@ -74,6 +94,9 @@ class GameConnector:
             fetch=True,
             one=True,
         )
+        if data is None:
+            return None
+        _GAME_ROW_CACHE[game_id] = data
         game = Game.from_dict(data)
 
         return game
@@ -121,19 +144,34 @@ class GameConnector:
             games (List[Game]): a list of games ordered by how closely they match the given text.
         """
 
-        data = self.get_games()
-        games = []
+        data = query_db(
+            """
+            SELECT 
+            g.game_id, 
+            g.title, 
+            g.description,
+            g.release_date, 
+            g.publisher, 
+            g.developer, 
+            g.image_link 
+            FROM Games g
+            """
+        )
 
-        # test how much they match the provided
-        for game in data:
-            closeness = fuzz.ratio(matching_text, game.title)
-            if closeness > 20:
-                games.append((closeness, game))
+        # score and sort every title in one call to rapidfuzz's C extension.
+        matches = process.extract(
+            matching_text,
+            [row["title"] for row in data],
+            scorer=fuzz.ratio,
+            limit=None,
+            score_cutoff=MIN_MATCH_SCORE,
+        )
+        # rank by rounded score like thefuzz did, so ties stay in table order.
+        matches.sort(key=lambda match: (-round(match[1]), match[2]))
 
-        # sort games by how close they are
-        games.sort(key=lambda pair: pair[0], reverse=True)
-        # remove closeness from list
-        games = [pair[1] for pair in games]
+        # each match is (title, closeness, index),
+        # only matched rows are turned into games.
+        games = [Game.from_dict(data[index]) for _, _, index in matches]
         return games
 
     def get_games_by_platform_ids(self, platform_ids: list[int]):
@@ -151,23 +189,21 @@ class GameConnector:
         if not platform_ids:
             return []
 
+        # ids are passed as one JSON array so the SQL is the same for any number of ids.
         query = """
             SELECT 
                 g.game_id, g.title, g.description, g.release_date, g.publisher, g.developer, g.image_link, 
-                COUNT(PlatformAssignment.game_tag_id) as tag_match_count
+                COUNT(PlatformAssignment.platform_id) as platform_match_count
             FROM Games g
-            JOIN PlatformAssignment ON g.game_id = PLatformAssignment.game_id
-            WHERE PLatformAssignment.game_tag_id IN (?)
+            JOIN PlatformAssignment ON g.game_id = PlatformAssignment.game_id
+            WHERE PlatformAssignment.platform_id IN (SELECT value FROM json_each(?))
             GROUP BY g.game_id
-            ORDER BY tag_match_count DESC
+            ORDER BY platform_match_count DESC
         """
-        data = query_db(query, platform_ids, fetch=True, one=False)
+        data = query_db(query, (json.dumps(platform_ids),), fetch=True, one=False)
 
         # convert data into games.
-        games = []
-        for row in data:
-            game = Game.from_dict(row)
-            games.append(game)
+        games = [Game.from_dict(row) for row in data]
         return games
 
     def get_games_by_game_tag_ids(self, game_tag_ids: list[int]):
@@ -185,53 +221,88 @@ class GameConnector:
         if not game_tag_ids:
             return []
 
+        # ids are passed as one JSON array so the SQL is the same for any number of ids.
         query = """
             SELECT 
-                 g.game_id, g.title, g.description, g.release_date, g.publisher, g.developer, g.image_link,, 
+                g.game_id, g.title, g.description, g.release_date, g.publisher, g.developer, g.image_link, 
                 COUNT(GameTagAssignment.game_tag_id) as tag_match_count
             FROM Games g
             JOIN GameTagAssignment ON g.game_id = GameTagAssignment.game_id
-            WHERE GameTagAssignment.game_tag_id IN (?)
+            WHERE GameTagAssignment.game_tag_id IN (SELECT value FROM json_each(?))
             GROUP BY g.game_id
             ORDER BY tag_match_count DESC
         """
-        data = query_db(query, game_tag_ids, fetch=True, one=False)
+        data = query_db(query, (json.dumps(game_tag_ids),), fetch=True, one=False)
 
         # Convert data into games list.
-        games = []
-        for row in data:
-            game = Game.from_dict(row)
-            games.append(game)
+        games = [Game.from_dict(row) for row in data]
         return games
 
-    def add_game(self, game: Game) -> None:
+    def add_game(
+        self,
+        game: Game,
+        game_tag_ids: Iterable[int] = (),
+        platform_ids: Iterable[int] = (),
+    ) -> int:
         """
         Add a new game to the database and its associated platforms and game_tags.
+        Everything is written in one transaction so only a single commit is made.
 
         Args:
             game (Game): game object that contains all relevant information for adding a new game
+            game_tag_ids (Iterable[int]): ids of game tags to link to the new game.
+            platform_ids (Iterable[int]): ids of platforms to link to the new game.
 
         Returns:
-            None
+            game_id (int): id of the newly added game.
+        Raises:
+            KeyError: if any game tag or platform id does not exist, nothing is added.
         """
+        game_tag_ids = list(game_tag_ids)
+        platform_ids = list(platform_ids)
         game_insert = """
         INSERT INTO Games 
         (title, description, release_date, developer, publisher, image_link)
         VALUES (?,?,?,?,?,?)
         """
         args = (
-            game_insert,
-            (
-                game.title,
-                game.description,
-                game.release_date,
-                game.developer,
-                game.publisher,
-                game.image_link,
-            ),
+            game.title,
+            game.description,
+            game.release_date,
+            game.developer,
+            game.publisher,
+            game.image_link,
         )
 
-        query_db(game_insert, args, fetch=False, one=False)
+        db, cursor = get_database()
+        # commits once at the end, or rolls back the game and links on error.
+        with DATABASE_LOCK, db:
+            cursor.execute(game_insert, args)
+            game_id = cursor.lastrowid
+            # Same existence checks as link_game_tag / link_platform: a missing id
+            # inserts no row, so the rowcount comes up short.
+            cursor.executemany(
+                """
+                INSERT INTO GameTagAssignment (game_id, game_tag_id)
+                SELECT ?, gt.game_tag_id FROM GameTags gt WHERE gt.game_tag_id = ?
+                """,
+                [(game_id, tag_id) for tag_id in game_tag_ids],
+            )
+            if cursor.rowcount != len(game_tag_ids):
+                cursor.close()
+                raise KeyError(f"No Game Tag for every id in {game_tag_ids}")
+            cursor.executemany(
+                """
+                INSERT INTO PlatformAssignment (game_id, platform_id)
+                SELECT ?, p.platform_id FROM Platforms p WHERE p.platform_id = ?
+                """,
+                [(game_id, platform_id) for platform_id in platform_ids],
+            )
+            if cursor.rowcount != len(platform_ids):
+                cursor.close()
+                raise KeyError(f"No Platform for every id in {platform_ids}")
+        cursor.close()
+        return game_id
 
     def update_game(self, new_game: Game = None):
         """
@@ -258,6 +329,7 @@ class GameConnector:
             new_game.image_link,
         )
         query_db(update, args, fetch=False, one=False)
+        _GAME_ROW_CACHE.clear()
 
     def delete_game_by_id(self, game_id: int) -> None:
         """
@@ -273,6 +345,7 @@ class GameConnector:
         query_db(
             "DELETE FROM Games WHERE game_id = ?", (game_id,), fetch=False, one=False
         )
+        _GAME_ROW_CACHE.pop(game_id, None)
 
     def link_game_tag(self, game_id: int, game_tag_id: int) -> None:
         """
@@ -283,13 +356,21 @@ class GameConnector:
             game_tag_id (int): game tag tuple whose id will be used to link to game.
         Returns:
             None
+        Raises:
+            KeyError: if no game tag with game_tag_id exists.
         """
-        query_db(
-            "INSERT INTO GameTagAssignment (game_id, game_tag_id) VALUES (?,?)",
+        # Only inserts if the game tag exists, so no separate lookup is needed.
+        cursor = query_db(
+            """
+            INSERT INTO GameTagAssignment (game_id, game_tag_id)
+            SELECT ?, gt.game_tag_id FROM GameTags gt WHERE gt.game_tag_id = ?
+            """,
             (game_id, game_tag_id),
             fetch=False,
             one=False,
         )
+        if cursor.rowcount == 0:
+            raise KeyError(f"No Game Tag with id {game_tag_id}")
 
     def link_platform(self, game_id: int, platform_id: int) -> None:
         """
@@ -300,13 +381,21 @@ class GameConnector:
             platform_id (platform_id): platform the game is playable on.
         Returns:
             None
+        Raises:
+            KeyError: if no platform with platform_id exists.
         """
-        query_db(
-            "INSERT INTO PlatformAssignment (game_id, platform_id) VALUES (?,?)",
+        # Only inserts if the platform exists, so no separate lookup is needed.
+        cursor = query_db(
+            """
+            INSERT INTO PlatformAssignment (game_id, platform_id)
+            SELECT ?, p.platform_id FROM Platforms p WHERE p.platform_id = ?
+            """,
             (game_id, platform_id),
             fetch=False,
             one=False,
         )
+        if cursor.rowcount == 0:
+            raise KeyError(f"No Platform with id {platform_id}")
 
     def get_avg_rating(self, game_id: int):
         """
@@ -328,22 +417,23 @@ class GameConnector:
 
         return average
 
-    def get_date_str(self, game_id: int):
+    def get_date_str(self, game: Game, now: Optional[datetime] = None):
         """Returns the formatted date of when the game was released.
          timestamp -> dd/mm/yyyy + how long ago it was
 
         Args:
-            game_id (int): game id of game to get release date of.
+            game (Game): game to get release date of.
+            now (datetime): optional current time to share across many games.
         Returns:
             date_str (str): formatted date.
         """
 
-        game = self.get_game_by_id(game_id)
-
         # set up date
-        release_date = datetime.fromtimestamp(game.release_date)
+        if now is None:
+            now = datetime.now()
+        release_date = game.release_datetime
         date = release_date.date().strftime("%d/%m/%Y")
-        time_passed = datetime.now() - release_date
+        time_passed = now - release_date
 
         years_passed = time_passed.days / 365.25
         date_str = 0
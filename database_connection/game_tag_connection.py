@@ -1,7 +1,29 @@
 """functions that allow connection between database and web app.
 specifically for game tags (adventure, fighting, etc)."""
 
-from database_connection.base_db_connections import query_db, GameTag
+from typing import Optional
+from database_connection.base_db_connections import (
+    query_db,
+    check_data_version,
+    register_cache_clear,
+    GameTag,
+)
+
+# Game tags rarely change, so lookups by id are kept until that tag is changed.
+_TAG_CACHE: dict[int, GameTag] = {}
+# Full list of game tags for the search filters, cleared whenever any tag changes.
+_ALL_TAGS: Optional[list[GameTag]] = None
+
+
+def _clear_tag_cache() -> None:
+    """empties both game tag caches."""
+    global _ALL_TAGS
+    _TAG_CACHE.clear()
+    _ALL_TAGS = None
+
+
+register_cache_clear(_clear_tag_cache)
+
 
 class GameTagConnector:
     """class that contains game tag related functions for the database"""
@@ -19,21 +41,28 @@ class GameTagConnector:
         Returns:
             None
         """
+        global _ALL_TAGS
         query_db(
             "INSERT INTO GameTags (game_tag_name) VALUES (?)", (name,), fetch=False
         )
+        _ALL_TAGS = None
 
     def get_game_tags(self) -> list[GameTag]:
         """
         Returns a list of all game tags.
         """
-        data = query_db("SELECT gt.game_tag_id, gt.game_tag_name FROM GameTags gt")
+        global _ALL_TAGS
+        check_data_version()
+        if _ALL_TAGS is None:
+            data = query_db("SELECT gt.game_tag_id, gt.game_tag_name FROM GameTags gt")
+
+            # Convert data to game tags
+            _ALL_TAGS = [
+                GameTag(tag["game_tag_id"], tag["game_tag_name"]) for tag in data
+            ]
 
-        # Convert data to game tags
-        game_tags = []
-        for tag in data:
-            game_tags.append(GameTag(tag["game_tag_id"], tag["game_tag_name"]))
-        return game_tags
+        # copy so callers can't change the cached list.
+        return list(_ALL_TAGS)
 
     def get_tags_by_game_name(self, game_name: str) -> list[GameTag]:
         """
@@ -47,17 +76,15 @@ class GameTagConnector:
             TypeError: if game_name is not a string.
         """
         query = """
-                SELECT game_tag_id FROM Games g
-                JOIN GameTagAssignment gt 
-                ON g.game_id = gt.game_id WHERE g.title = ?
+                SELECT gt.game_tag_id, gt.game_tag_name FROM Games g
+                JOIN GameTagAssignment gta ON g.game_id = gta.game_id
+                JOIN GameTags gt ON gta.game_tag_id = gt.game_tag_id
+                WHERE g.title = ?
                 """
         data = query_db(query, (game_name,))
 
         # convert data into game tags
-        tags = []
-        for tag_dict in data:
-            tag = self.get_game_tag_by_id(tag_dict["game_tag_id"])
-            tags.append(tag)
+        tags = [GameTag(tag["game_tag_id"], tag["game_tag_name"]) for tag in data]
         return tags
 
     def get_game_tag_by_name(self, tag_name: str) -> GameTag:
@@ -94,13 +121,20 @@ class GameTagConnector:
         Raises:
             TypeError: If tag_id is not an integer.
         """
+        # Use the cached game tag if it has already been looked up.
+        check_data_version()
+        if tag_id in _TAG_CACHE:
+            return _TAG_CACHE[tag_id]
+
         data = query_db(
             "SELECT gt.game_tag_id, gt.game_tag_name FROM GameTags gt WHERE game_tag_id = ?",
             (tag_id,),
             fetch=True,
             one=True,
         )
-        return GameTag(data["game_tag_id"], data["game_tag_name"])
+        tag = GameTag(data["game_tag_id"], data["game_tag_name"])
+        _TAG_CACHE[tag_id] = tag
+        return tag
 
     def update_game_tag(self, new_tag: GameTag):
         """
@@ -111,11 +145,14 @@ class GameTagConnector:
         Returns:
             None
         """
+        global _ALL_TAGS
         query_db(
             "UPDATE GameTags SET game_tag_name = ? WHERE game_tag_id = ?",
-            (new_tag,),
+            (new_tag.name, new_tag.tag_id),
             fetch=False,
         )
+        _TAG_CACHE.pop(new_tag.tag_id, None)
+        _ALL_TAGS = None
 
     def delete_game_tag_by_id(self, tag_id: int):
         """
@@ -127,6 +164,7 @@ class GameTagConnector:
         Returns:
             None
         """
+        global _ALL_TAGS
         query_db(
             "DELETE FROM GameTags WHERE game_tag_id = ?",
             (tag_id,),
@@ -141,3 +179,5 @@ class GameTagConnector:
             fetch=False,
             one=False,
         )
+        _TAG_CACHE.pop(tag_id, None)
+        _ALL_TAGS = None
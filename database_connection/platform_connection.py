@@ -1,8 +1,14 @@
 """functions that allow connection between database and web app specifically for platforms
 (playstation 5, xbox one, etc)."""
 
-from database_connection.base_db_connections import query_db
-from database_connection.base_db_connections import Platform, GameTag
+from typing import Optional
+from database_connection.base_db_connections import query_db, check_data_version
+from database_connection.base_db_connections import register_cache_clear
+from database_connection.base_db_connections import Platform
+
+# Platforms rarely change, so lookups by id are kept until that platform is changed.
+_PLATFORM_CACHE: dict[int, Platform] = {}
+register_cache_clear(_PLATFORM_CACHE.clear)
 
 
 class PlatformConnector:
@@ -40,6 +46,7 @@ class PlatformConnector:
             fetch=False,
             one=False,
         )
+        _PLATFORM_CACHE.pop(platform_id, None)
 
     def update_platform(self, new_platform: Platform):
         """
@@ -52,10 +59,11 @@ class PlatformConnector:
         """
         query_db(
             "UPDATE Platforms SET platform_name = ? WHERE platform_id = ?",
-            (new_platform.name, new_platform.id),
+            (new_platform.name, new_platform.platform_id),
             fetch=False,
             one=False,
         )
+        _PLATFORM_CACHE.pop(new_platform.platform_id, None)
 
     def get_platforms(self) -> list[Platform]:
         """
@@ -64,9 +72,7 @@ class PlatformConnector:
         data = query_db("SELECT p.platform_id, p.platform_name FROM Platforms p")
 
         # convert data to platforms
-        platforms = []
-        for tag in data:
-            platforms.append(GameTag(tag["platform_id"], tag["platform_name"]))
+        platforms = [Platform(row["platform_id"], row["platform_name"]) for row in data]
         return platforms
 
     def get_platforms_by_game_name(self, game_name: str) -> list[Platform]:
@@ -81,11 +87,12 @@ class PlatformConnector:
             TypeError: if game_name is not a string.
         """
 
-        platform_ids = query_db(
+        data = query_db(
             """
-                SELECT platform_id FROM Games g 
-                JOIN PlatformAssignment p ON 
-                g.game_id = p.game_id WHERE g.title = ?
+                SELECT p.platform_id, p.platform_name FROM Games g
+                JOIN PlatformAssignment pa ON g.game_id = pa.game_id
+                JOIN Platforms p ON pa.platform_id = p.platform_id
+                WHERE g.title = ?
                 """,
             (game_name,),
             fetch=True,
@@ -93,13 +100,34 @@ class PlatformConnector:
         )
 
         # convert data to platforms
-        platforms = []
-        for platform_dict in platform_ids:
-            tag = self.get_platform_by_id(platform_dict["platform_id"])
-            platforms.append(tag)
+        platforms = [Platform(row["platform_id"], row["platform_name"]) for row in data]
+        return platforms
+
+    def get_platforms_by_game_id(self, game_id: int) -> list[Platform]:
+        """
+        gets a list of platforms that a game is playable on, using its id directly.
+
+        Args:
+            game_id (int): id of game to find platforms for
+        Returns:
+            platforms: (list[Platform]): A list of Platform namedTuples with id and name
+        """
+        data = query_db(
+            """
+                SELECT p.platform_id, p.platform_name FROM PlatformAssignment pa
+                JOIN Platforms p ON pa.platform_id = p.platform_id
+                WHERE pa.game_id = ?
+                """,
+            (game_id,),
+            fetch=True,
+            one=False,
+        )
+
+        # convert data to platforms
+        platforms = [Platform(row["platform_id"], row["platform_name"]) for row in data]
         return platforms
 
-    def get_platform_by_name(self, platform_name: str) -> Platform:
+    def get_platform_by_name(self, platform_name: str) -> Optional[Platform]:
         """
         Returns platform row from database using name.
 
@@ -107,7 +135,7 @@ class PlatformConnector:
             platform_name (str): The name of the game tag to retrieve.
 
         Returns:
-            Platform (NameTuple): a tuple with id and name.
+            Platform (NameTuple): a tuple with id and name, or None if not found.
 
         Raises:
             TypeError: If platform_name is not an string.
@@ -119,6 +147,8 @@ class PlatformConnector:
             fetch=True,
             one=True,
         )
+        if data is None:
+            return None
 
         return Platform(data["platform_id"], data["platform_name"])
 
@@ -133,10 +163,17 @@ class PlatformConnector:
             Platform (NamedTuple): a tuple with id and name.
 
         """
+        # Use the cached platform if it has already been looked up.
+        check_data_version()
+        if platform_id in _PLATFORM_CACHE:
+            return _PLATFORM_CACHE[platform_id]
+
         data = query_db(
             "SELECT p.platform_id, p.platform_name FROM Platforms p WHERE platform_id = ?",
             (platform_id,),
             fetch=True,
             one=True,
         )
-        return Platform(data["platform_id"], data["platform_name"])
+        platform = Platform(data["platform_id"], data["platform_name"])
+        _PLATFORM_CACHE[platform_id] = platform
+        return platform
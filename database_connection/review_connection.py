@@ -3,9 +3,46 @@
 from database_connection.base_db_connections import (
     query_db,
     Review,
+    PublicUser,
+    Platform,
 )
 
 
+# Reviews with the user that wrote them and the platform they were played on.
+# password_hash is never selected since these users are sent to the browser.
+JOINED_REVIEWS_QUERY = """
+SELECT 
+r.review_id, r.user_id, r.game_id,
+r.rating, r.review_text, r.review_date, 
+r.has_colourblind_support, r.has_subtitles, r.has_difficulty_options, 
+r.platform_id, 
+u.username, u.date_joined, p.platform_name 
+FROM Reviews r 
+INNER JOIN Users u 
+ON r.user_id = u.user_id
+INNER JOIN Platforms p 
+ON r.platform_id = p.platform_id
+WHERE {condition}
+ORDER BY r.review_id
+"""
+
+
+def _review_from_joined_row(row) -> Review:
+    """creates a review with its user and platform from a joined Reviews row."""
+    review = Review.from_dict(row)
+    review.user = PublicUser.from_dict(row)
+    review.platform = Platform(row["platform_id"], row["platform_name"])
+    return review
+
+
+def _get_joined_reviews(condition: str, args: tuple) -> list[Review]:
+    """returns reviews matching the SQL condition, with user and platform filled in."""
+    data = query_db(
+        JOINED_REVIEWS_QUERY.format(condition=condition), args, fetch=True, one=False
+    )
+    return [_review_from_joined_row(row) for row in data]
+
+
 class ReviewConnector:
     """class that contains review related functions for the database"""
 
@@ -107,13 +144,26 @@ class ReviewConnector:
         r.has_subtitles, 
         r.has_difficulty_options, 
         platform_id FROM Reviews 
-        r WHERE game_id = ?"""
+        r WHERE game_id = ?
+        ORDER BY r.review_id"""
         data = query_db(query, (game_id,), fetch=True, one=False)
 
         # create a list of reviews with data and return.
         reviews = [Review.from_dict(row) for row in data]
         return reviews
 
+    def get_reviews_with_users_by_game_id(self, game_id: int):
+        """
+        Returns all reviews for a game with the user that wrote each one
+        and the platform it was played on, in a single query.
+
+        Args:
+            game_id (int): id of game that has review.
+        Returns:
+            reviews (list[Review]): list of reviews with user and platform filled in.
+        """
+        return _get_joined_reviews("r.game_id = ?", (game_id,))
+
     def get_review_by_game_and_user(self, game_id: int, user_id: int):
         """
         Returns review with all data using user id and game id to find.
@@ -122,7 +172,7 @@ class ReviewConnector:
             game_id (int): id of game that has review.
             user_id (int): id of user that wrote review.
         Returns:
-            review (Review): a review object with relevant data.
+            review (Review): a review object with relevant data, or None if not found.
         """
 
         # Get Review.
@@ -145,6 +195,8 @@ class ReviewConnector:
             fetch=True,
             one=True,
         )
+        if data is None:
+            return None
         # Return review as class.
         review = Review.from_dict(data)
         return review
@@ -156,27 +208,13 @@ class ReviewConnector:
         Args:
             game_name (str): name of the game to find reviews for.
         Returns:
-            reviews (list[Review]): list of review objects with all data.
-        """
-
-        query = """
-        SELECT 
-        r.review_id, r.user_id, r.game_id,
-        r.rating, r.review_text, r.review_date, 
-        r.has_colourblind_support, r.has_subtitles, r.has_difficulty_options, 
-        r.platform_id 
-        FROM Reviews r 
-        INNER JOIN Games g 
-        ON r.game_id = g.game_id
-        WHERE g.title = ?
+            reviews (list[Review]): list of review objects with all data,
+            including the user that wrote them and the platform played on.
         """
-        data = query_db(query, (game_name,), fetch=True, one=False)
-
-        # Turn data into review object and return data.
-        reviews = []
-        for review_data in data:
-            reviews.append(Review.from_dict(review_data))
-        return reviews
+        return _get_joined_reviews(
+            "r.game_id = (SELECT g.game_id FROM Games g WHERE g.title = ?)",
+            (game_name,),
+        )
 
     def get_reviews_by_username(self, user_name: str):
         """
@@ -185,27 +223,10 @@ class ReviewConnector:
         Args:
             user_name (str): name of the user to find reviews for.
         Returns:
-            reviews (list[Review]): list of review objects with all data.
+            reviews (list[Review]): list of review objects with all data,
+            including the user that wrote them and the platform played on.
         """
-
-        query = """
-        SELECT 
-        r.review_id, r.user_id, r.user_id,
-        r.rating, r.review_text, r.review_date, 
-        r.has_colourblind_support, r.has_subtitles, r.has_difficulty_options, 
-        r.platform_id 
-        FROM Reviews r 
-        INNER JOIN Users u 
-        ON r.game_id = u.game_id
-        WHERE u.username = ?
-        """
-        data = query_db(query, (user_name,), fetch=True, one=False)
-
-        # Turn data into review object and return data.
-        reviews = []
-        for review_data in data:
-            reviews.append(Review.from_dict(review_data))
-        return reviews
+        return _get_joined_reviews("u.username = ?", (user_name,))
 
     def get_reviews_by_game_and_platform(self, game_id: int, platform_id: int):
         """
@@ -229,17 +250,15 @@ class ReviewConnector:
             r.has_subtitles, 
             r.has_difficulty_options, 
             platform_id FROM Reviews 
-            r WHERE game_id = ? and platform_id = ?""",
+            r WHERE game_id = ? and platform_id = ?
+            ORDER BY r.review_id""",
             (game_id, platform_id),
             fetch=True,
             one=False,
         )
 
         # Turn data into review object and return data.
-        reviews = []
-        for row in data:
-            review = Review.from_dict(row)
-            reviews.append(review)
+        reviews = [Review.from_dict(row) for row in data]
         return reviews
 
     def delete_review_by_id(self, review_id: int) -> None:
@@ -1,17 +1,68 @@
 """functions that allow connection between database and web app specifically for users."""
 
-from datetime import datetime
-from flask import session
+from collections import OrderedDict
+import time
+import threading
+from flask import g, session
 from werkzeug import security
-from database_connection.base_db_connections import query_db, User
+from database_connection.base_db_connections import (
+    query_db,
+    check_data_version,
+    register_cache_clear,
+    User,
+)
 
 # if not logged in, use default user, sort of like guest.
-DEFAULT_USER = {
-    "user_id": None,
-    "username": None,
-    "password_hash": None,
-    "date_joined": None,
-}
+# built once and shared, nothing should modify it.
+DEFAULT_USER = User(user_id=None, username=None, password_hash=None, date_joined=None)
+
+# Most recently looked up users, so each page load doesn't have to query Users.
+# A user's entries are removed whenever that user is changed.
+USER_CACHE_SIZE = 256
+_users_by_id: OrderedDict = OrderedDict()
+_users_by_name: OrderedDict = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+
+def _get_cached_user(cache: OrderedDict, key):
+    """returns user cached under key and marks it recently used, None if not cached."""
+    with _user_cache_lock:
+        user = cache.get(key)
+        if user is not None:
+            cache.move_to_end(key)
+        return user
+
+
+def _cache_user(user: User) -> None:
+    """stores user by id and username, removing least recently used users if full."""
+    with _user_cache_lock:
+        keys = ((_users_by_id, user.user_id), (_users_by_name, user.username))
+        for cache, key in keys:
+            cache[key] = user
+            cache.move_to_end(key)
+            while len(cache) > USER_CACHE_SIZE:
+                cache.popitem(last=False)
+
+
+def _clear_user_cache() -> None:
+    """empties both user caches."""
+    with _user_cache_lock:
+        _users_by_id.clear()
+        _users_by_name.clear()
+
+
+register_cache_clear(_clear_user_cache)
+
+
+def _uncache_user(user_id: int = None, username: str = None) -> None:
+    """removes any cached entries for the user with either the given id or username."""
+    with _user_cache_lock:
+        _users_by_id.pop(user_id, None)
+        _users_by_name.pop(username, None)
+        # username may have been cached under a name that has since changed.
+        for name, user in list(_users_by_name.items()):
+            if user.user_id == user_id:
+                del _users_by_name[name]
 
 
 class UserConnector:
@@ -28,10 +79,17 @@ class UserConnector:
             user_id (int): The ID of the user to retrieve.
 
         Returns:
-            user (User): object containing each column of found row in database.
+            user (User): object containing each column of found row in database,
+            None if no user has the id.
         Raises:
             TypeError: If user_id is not an integer.
         """
+        # Use the cached user if it was looked up recently.
+        check_data_version()
+        user = _get_cached_user(_users_by_id, user_id)
+        if user is not None:
+            return user
+
         data = query_db(
             """
             SELECT 
@@ -47,7 +105,13 @@ class UserConnector:
             one=True,
     
         )
+
+        # Check to prevent making a User with None data which causes an error.
+        if data is None:
+            return None
+
         user = User.from_dict(data)
+        _cache_user(user)
         return user
 
     def get_user_by_username(self, username: str) -> User:
@@ -63,6 +127,8 @@ class UserConnector:
         Raises:
             TypeError: If username is not an string.
         """
+        # Always read from the database, login checks password_hash from this
+        # and another process may have changed or deleted the user since it was cached.
         data = query_db(
             """SELECT 
             u.user_id, 
@@ -80,29 +146,57 @@ class UserConnector:
 
         # Check to prevent making a User with None data which causes an error.
         if data is None:
+            _uncache_user(username=username)
             return None
 
         user = User.from_dict(data)
+        _cache_user(user)
         return user
 
+    def user_exists(self, username: str) -> bool:
+        """
+        Checks if a user with the username exists, without fetching their row.
+
+        Args:
+            username (str): The username to check.
+
+        Returns:
+            exists (bool): True if the username is taken.
+        """
+        # always asks the database, a cached user may have been deleted since.
+        # username is UNIQUE so this is answered from its index alone.
+        data = query_db(
+            "SELECT 1 FROM Users WHERE username = ? LIMIT 1",
+            (username,),
+            fetch=True,
+            one=True,
+        )
+        return data is not None
+
     def get_user_session(self):
         """
         returns the user if logged into user session, other returns default n/a user.
         """
-        # if user_id is not in session keys, user is not logged in.
-        if not "user_id" in session.keys():
-            session["user_id"] = None
+        # if user_id is not in session, user is not logged in.
+        # session is only read, so guests aren't sent a newly signed cookie each request.
+        user_id = session.get("user_id")
+
+        # reuse this request's user, unless they logged in or out since it was found.
+        cached = g.get("session_user")
+        if cached is not None and cached[0] == user_id:
+            return cached[1]
 
-        if not session["user_id"] is None:
+        user = None
+        if user_id is not None:
             # user is logged in, therefore can get user object
-            user = self.get_user_by_id(session["user_id"])
-            user.date_joined = datetime.fromtimestamp(round(user.date_joined))
-        else:
-            # not logged in so default user
-            user = User.from_dict(DEFAULT_USER)
+            user = self.get_user_by_id(user_id)
+        if user is None:
+            # not logged in (or user was deleted) so default user
+            user = DEFAULT_USER
+        g.session_user = (user_id, user)
         return user
 
-    def add_user(self, username: str, password: str) -> None:
+    def add_user(self, username: str, password: str) -> int:
         """
         Add a new user to the database with hashed password and current time as join date.
 
@@ -111,15 +205,17 @@ class UserConnector:
             password (str): the non-hashed password for hashing and storing
 
         Returns:
-            None
+            user_id (int): id of the newly added user.
         """
-        date_joined = datetime.now().timestamp()
+        date_joined = time.time()
         password_hash = security.generate_password_hash(password)
-        query_db(
+        cursor = query_db(
             "INSERT INTO Users (username, password_hash, date_joined) VALUES (?,?,?)",
             (username, password_hash, date_joined),
             fetch=False
         )
+        _uncache_user(username=username)
+        return cursor.lastrowid
 
     def delete_user_by_id(self, user_id: int) -> None:
         """
@@ -132,8 +228,9 @@ class UserConnector:
             None
 
         """
-        query_db("DELETE FROM Reviews WHERE user_id = ?", (user_id,))
-        query_db("DELETE FROM Users WHERE user_id = ?", (user_id,))
+        query_db("DELETE FROM Reviews WHERE user_id = ?", (user_id,), fetch=False)
+        query_db("DELETE FROM Users WHERE user_id = ?", (user_id,), fetch=False)
+        _uncache_user(user_id=user_id)
 
     def update_user(
         self, user_id: int, username: str = None, password: str = None
@@ -153,20 +250,28 @@ class UserConnector:
             ValueError: If neither username nor password is provided
         """
 
+        # empty values are skipped like None, so they can't blank the column.
+        username = username or None
+        password = password or None
         if username is None and password is None:
             raise ValueError(
                 "update_user() requires either username or password, neither were provided"
             )
 
-        query = "UPDATE Users SET "
-        values = ()
-        if username:
-            query = query + username
-            values = (*values, username)
-        if password:
+        # Only hash if a new password was given, None keeps the current hash.
+        password_hash = None
+        if password is not None:
             password_hash = security.generate_password_hash(password)
-            query = query + password_hash
-            values = (*values, password_hash)
-        query = query + "WHERE user_id = ?"
-        values = (*values, user_id)
-        query_db(query, values, fetch=False)
+
+        # COALESCE keeps the current value for any column passed as None.
+        query_db(
+            """
+            UPDATE Users
+            SET username = COALESCE(?, username),
+            password_hash = COALESCE(?, password_hash)
+            WHERE user_id = ?
+            """,
+            (username, password_hash, user_id),
+            fetch=False,
+        )
+        _uncache_user(user_id=user_id, username=username)
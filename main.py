@@ -2,6 +2,7 @@
 Main Application Program, starts flask site.
 """
 
+import os
 import secrets
 import re
 import time
@@ -10,7 +11,6 @@ from werkzeug import security
 
 from flask import (
     Flask,
-    g,
     redirect,
     url_for,
     render_template,
@@ -26,6 +26,7 @@ from database_connection.game_tag_connection import GameTagConnector
 from database_connection.platform_connection import PlatformConnector
 from database_connection.game_connection import GameConnector
 from database_connection.review_connection import ReviewConnector, Review
+from database_connection.base_db_connections import AccessibilityOptions
 
 
 # App Setup
@@ -37,16 +38,24 @@ GameConnection = GameConnector()
 ReviewConnection = ReviewConnector()
 
 app = Flask(__name__)
-app.config["SECRET_KEY"] = secrets.token_urlsafe(32)
+# Set FLASK_SECRET_KEY so every worker signs sessions with the same key,
+# otherwise a random key is made and sessions end when the process restarts.
+app.config["SECRET_KEY"] = (
+    os.environ.get("FLASK_SECRET_KEY") or secrets.token_urlsafe(32)
+)
 
 
 # Web App Logic
+@app.template_filter("ts")
+def format_timestamp(timestamp: int) -> str:
+    """formats a unix timestamp as dd/mm/yyyy, only done for values a template shows."""
+    return datetime.fromtimestamp(timestamp).strftime("%d/%m/%Y")
+
+
 @app.teardown_appcontext
-def close_database_connection(exception):
-    """closes database when app has been closed"""
-    db = g.pop("db", None)
-    if db is not None:
-        db.close()
+def report_teardown_error(exception):
+    """reports any error raised during a request,
+    database connection is shared so is left open for the next request."""
     if exception is not None:
         print(f"ERROR: {exception} RAISED ON CLOSING APP")
 
@@ -61,6 +70,7 @@ def home():
     games = GameConnection.get_games()
 
     # get accessibilty ratings for the games.
+    now = datetime.now()
     for game in games:
         game.rating = GameConnection.get_avg_rating(game.game_id)
 
@@ -71,14 +81,14 @@ def home():
         game.has_subtitles = accessibilty_ratios[1]
         game.has_difficulty_options = accessibilty_ratios[2]
 
-        game.date_str = GameConnection.get_date_str(game.game_id)
+        game.date_str = GameConnection.get_date_str(game, now)
 
     # sort games by when they released.
     recent_games = sorted(games, key=lambda g: g.release_date, reverse=True)
     # sort by game rating.
     best_games = sorted(games, key=lambda g: g.rating, reverse=True)
 
-    current_year = datetime.now().year
+    current_year = now.year
     # Jan 1st of current year.
     start_current_year = datetime(current_year, 1, 1)
     # Jan 1st as timestamp for comparing to current year.
@@ -167,15 +177,14 @@ def register_page():
             )
 
         # Make user user doesn't already exist
-        if UserConnection.get_user_by_username(username):
+        if UserConnection.user_exists(username):
             flash("Username is Already Taken!")
             return render_template(
                 "register.html", user=UserConnection.get_user_session()
             )
 
         # Add user and log current session into user.
-        UserConnection.add_user(username, password)
-        session["user_id"] = UserConnection.get_user_by_username(username).user_id
+        session["user_id"] = UserConnection.add_user(username, password)
         return redirect(url_for("home"))
     return render_template("register.html", user=UserConnection.get_user_session())
 
@@ -183,7 +192,7 @@ def register_page():
 @app.route("/logout")
 def logout():
     """removes user's user_id in the session and sends to home page"""
-    session["user_id"] = None
+    session.pop("user_id", None)
     return redirect(url_for("login_page"))
 
 
@@ -200,7 +209,7 @@ def search_page():
 
         # Get Game Tags that are on.
         for key, value in request.args.items():
-            print(key, value)
+            app.logger.debug("search arg %s=%s", key, value)
             if value == "on":
                 filters.append(key)
 
@@ -219,9 +228,10 @@ def search_page():
         else:
             games = GameConnection.get_games_by_closest_match(search_term)
 
+        now = datetime.now()
         for game in games:
             # Format each game's release date
-            game.date_str = GameConnection.get_date_str(game.game_id)
+            game.date_str = GameConnection.get_date_str(game, now)
 
             # Get Average Rating for each Game
             game.rating = GameConnection.get_avg_rating(game.game_id)
@@ -258,38 +268,65 @@ def game_page(game_id: int):
     if method in ("POST, PUT"):
 
         # Shared Logic
-        data = request.form.to_dict(flat=True)
-        data["user_id"] = UserConnection.get_user_session().user_id
-        data["game_id"] = game_id
-        data["platform_id"] = PlatformConnection.get_platform_by_name(
-            data["user_platform"]
-        ).platform_id
-        data["review_date"] = datetime.now().timestamp()
-
-        data["has_subtitles"] = bool(data.get("has_subtitles"))
-        data["has_difficulty_options"] = bool(data.get("has_difficulty_options"))
-        data["has_colourblind_support"] = bool(data.get("has_colourblind_support"))
-
-        review = Review.from_dict(data)
+        # only logged in users can review, and only games that exist.
+        if user.user_id is None:
+            flash("Log in to write a review!")
+            return redirect(url_for("game_page", game_id=game_id))
+        if GameConnection.get_game_by_id(game_id) is None:
+            flash("Game Not Found")
+            return redirect(url_for("home"))
+
+        # only the fields a review needs are read, so extra form fields are ignored.
+        form = request.form
+        platform = PlatformConnection.get_platform_by_name(form["user_platform"])
+        try:
+            rating = int(form["rating"])
+        except ValueError:
+            rating = None
+        review_text = form.get("review_text", "")
+        # rating must be within the slider's range (0 to 10).
+        if (
+            platform is None
+            or rating is None
+            or not 0 <= rating <= 10
+            or len(review_text) > 1000
+        ):
+            flash("Invalid Review!")
+            return redirect(url_for("game_page", game_id=game_id))
+
+        review = Review(
+            review_id=None,
+            user_id=user.user_id,
+            game_id=game_id,
+            rating=rating,
+            review_text=review_text,
+            review_date=time.time(),
+            accessibility=AccessibilityOptions(
+                has_colourblind_support=bool(form.get("has_colourblind_support")),
+                has_subtitles=bool(form.get("has_subtitles")),
+                has_difficulty_options=bool(form.get("has_difficulty_options")),
+            ),
+            platform_id=platform.platform_id,
+        )
+        # a user has at most one review per game, which PUT edits.
+        old_review = ReviewConnection.get_review_by_game_and_user(
+            game_id, user.user_id
+        )
 
         if method == "POST":
-            # writing review logic + security checks
-
-            if len(review.review_text) > 1000 or PlatformConnection.get_platform_by_id(
-                review.platform_id
-            ):
-                flash("Invalid Review!")
+            # writing review logic
+            if old_review is not None:
+                flash("Review Already Exists!")
             else:
                 ReviewConnection.add_review(review)
                 flash("Review Submitted!")
         else:  # method must be PUT
             # editing review logic
-            old_review = ReviewConnection.get_review_by_game_and_user(
-                data["game_id"], data["user_id"]
-            )
-            new_review = Review.from_dict(data)
-            ReviewConnection.update_review(new_review, old_review.review_id)
-            flash("Review Updated!")
+            if old_review is None:
+                flash("Review Not Found")
+            else:
+                ReviewConnection.update_review(review, old_review.review_id)
+                flash("Review Updated!")
 
         return redirect(url_for("game_page", game_id=game_id))
 
@@ -302,7 +339,7 @@ def game_page(game_id: int):
 
     # get reviews
 
-    reviews = ReviewConnection.get_reviews_by_game_id(game_id)
+    reviews = ReviewConnection.get_reviews_with_users_by_game_id(game_id)
     user_review = None
 
     # get accessibility ratings
@@ -312,18 +349,16 @@ def game_page(game_id: int):
     game.has_subtitles = accessibilty_ratios[1]
     game.has_difficulty_options = accessibilty_ratios[2]
 
-    # gett additional information pertaining to each review.
+    # find the current user's review, user and platform are already on each review.
     for review in reviews:
-        review.platform = PlatformConnection.get_platform_by_id(review.platform_id)
-        review.user = UserConnection.get_user_by_id(review.user_id)
-        if user.user_id == review.user.user_id:
+        if user.user_id == review.user_id:
             user_review = review
 
     return render_template(
         "game.html",
         game=game,
         user=user,
-        platforms=PlatformConnection.get_platforms_by_game_name(game.title),
+        platforms=PlatformConnection.get_platforms_by_game_id(game.game_id),
         reviews=reviews,
         user_review=user_review,
     )
@@ -337,38 +372,15 @@ def filter_reviews():
     filter_type = request.args.get("filter", "mixed")
     game_id = request.args.get("game_id")
 
-    reviews = ReviewConnection.get_reviews_by_game_id(game_id)
+    reviews = ReviewConnection.get_reviews_with_users_by_game_id(game_id)
 
     # create a list of reviews based on filter type.
     if filter_type == "positive":
-        filtered = [
-            (
-                r,
-                UserConnection.get_user_by_id(r.user_id),
-                PlatformConnection.get_platform_by_id(r.platform_id),
-            )
-            for r in reviews
-            if r.rating > 7
-        ]
+        filtered = [(r, r.user, r.platform) for r in reviews if r.rating > 7]
     elif filter_type == "negative":
-        filtered = [
-            (
-                r,
-                UserConnection.get_user_by_id(r.user_id),
-                PlatformConnection.get_platform_by_id(r.platform_id),
-            )
-            for r in reviews
-            if r.rating < 5
-        ]
+        filtered = [(r, r.user, r.platform) for r in reviews if r.rating < 5]
     else:
-        filtered = [
-            (
-                r,
-                UserConnection.get_user_by_id(r.user_id),
-                PlatformConnection.get_platform_by_id(r.platform_id),
-            )
-            for r in reviews
-        ]
+        filtered = [(r, r.user, r.platform) for r in reviews]
 
     return jsonify(filtered)  # send back to js code for processing.
 